@@ -1,13 +1,21 @@
 # C:\Projects\payslip\app.py
 from flask import Flask, send_from_directory, request, send_file, jsonify
-import os, tempfile, traceback, glob, shutil, threading, webbrowser, time
+import os, sys, traceback, threading, webbrowser, time, multiprocessing, uuid
 from werkzeug.utils import secure_filename
+from waitress import serve
 
 # Import the generator module directly (must be in same folder)
 import payslipGenerator
 
 app = Flask(__name__, static_folder='frontend/build', static_url_path='')
 
+# Generated ZIPs are archived next to the app (next to the exe when frozen by PyInstaller)
+if getattr(sys, 'frozen', False):
+    BASE_DIR = os.path.dirname(sys.executable)
+else:
+    BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+ARCHIVE_FOLDER = os.path.join(BASE_DIR, 'generated_zips')
+
 # Serve React index
 @app.route('/')
 def serve_react():
@@ -30,55 +38,27 @@ def generate_payslip():
         if not all([company, address, month, location, file]):
             return jsonify({'message': 'All fields are required.'}), 400
 
-        # Save uploaded Excel to temporary folder
-        temp_dir = tempfile.mkdtemp()
-        file_path = os.path.join(temp_dir, secure_filename(file.filename))
-        file.save(file_path)
-        print(f"[Flask] Uploaded file saved to: {file_path}")
+        # Write the ZIP straight into the permanent archive folder (no temp copy)
+        os.makedirs(ARCHIVE_FOLDER, exist_ok=True)
+        zip_root, zip_ext = os.path.splitext(payslipGenerator.default_zip_name(month))
+        output_zip = os.path.join(ARCHIVE_FOLDER, f"{zip_root}_{uuid.uuid4().hex[:8]}{zip_ext}")
 
-        # Call the generator function directly (non-interactive)
-        # It will create a ZIP in the same folder as file_path (base_dir)
+        # Read the upload straight from its request stream instead of saving it first;
+        # Werkzeug keeps small uploads in memory and larger ones in an anonymous temp file
+        print(f"[Flask] Received salary register: {secure_filename(file.filename)}")
         try:
-            payslipGenerator.process_file(file_path, company, address, month, location)
+            zip_path = payslipGenerator.process_file(file.stream, company, address, month, location,
+                                                     output_zip_path=output_zip)
         except Exception as gen_err:
             traceback.print_exc()
             return jsonify({'message': 'Generator error', 'error': str(gen_err)}), 500
 
-        # Locate the generated ZIP (temp_dir first, then project folder)
-        possible_zips = glob.glob(os.path.join(temp_dir, "Payslips_*.zip"))
-        if not possible_zips:
-            project_zips = glob.glob(os.path.join('C:/Projects/payslip', "Payslips_*.zip"))
-            possible_zips.extend(project_zips)
-
-        if not possible_zips:
-            return jsonify({'message': 'ZIP not found after generation.'}), 500
-
-        latest_zip = max(possible_zips, key=os.path.getctime)
-        print(f"[Flask] Found ZIP: {latest_zip}")
+        if not zip_path:
+            return jsonify({'message': 'Could not read the salary register.'}), 500
+        print(f"[Flask] Archived ZIP: {zip_path}")
 
-        # Archive to permanent folder
-        archive_folder = os.path.join('C:/Projects/payslip', 'generated_zips')
-        os.makedirs(archive_folder, exist_ok=True)
-        archived_zip = os.path.join(archive_folder, os.path.basename(latest_zip))
-        shutil.copy(latest_zip, archived_zip)
-        print(f"[Flask] Archived ZIP copied to: {archived_zip}")
-
-        # Prepare response
-        response = send_file(latest_zip, as_attachment=True)
-
-        # Cleanup temp (uploaded excel + temp zip + folder)
-        try:
-            if os.path.exists(file_path):
-                os.remove(file_path)
-            if temp_dir in latest_zip and os.path.exists(latest_zip):
-                os.remove(latest_zip)
-            if os.path.exists(temp_dir):
-                os.rmdir(temp_dir)
-            print(f"[Cleanup] Removed temp files in {temp_dir}")
-        except Exception as cleanup_err:
-            print(f"[Cleanup Warning] {cleanup_err}")
-
-        return response
+        return send_file(zip_path, as_attachment=True, conditional=True,
+                         download_name=os.path.basename(zip_path))
 
     except Exception as e:
         traceback.print_exc()
@@ -99,11 +79,14 @@ def _open_browser_later(url, delay=1.0):
 
 
 if __name__ == '__main__':
+    # Required for the PDF process pool when running as a frozen (PyInstaller) exe
+    multiprocessing.freeze_support()
     host = '127.0.0.1'
     port = 5000
     url = f"http://{host}:{port}"
     print(f"🚀 Starting Payslip app at {url}")
     # Open browser once (do not use reloader or debug mode that spawns two processes)
     _open_browser_later(url, delay=1.2)
-    # IMPORTANT: use_reloader=False to avoid double-opening and duplicate process
-    app.run(debug=False, use_reloader=False, host=host, port=port)
+    # Threaded production WSGI server, so one batch job doesn't block other requests.
+    # Kept small: every generate request already fans out to a process pool of PDF_WORKERS
+    serve(app, host=host, port=port, threads=4)
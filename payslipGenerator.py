@@ -18,15 +18,21 @@ import math
 import zipfile
 import glob
 import logging
+import logging.handlers
+import functools
 import tempfile
 import shutil
 import argparse
 import json
 import time
+import threading
 import concurrent.futures
+import multiprocessing
 from datetime import datetime
-from decimal import Decimal, InvalidOperation
 
+import openpyxl
+from openpyxl.cell.cell import ERROR_CODES
+import numpy as np
 import pandas as pd
 from reportlab.lib.pagesizes import A4
 from reportlab.lib.units import mm
@@ -38,11 +44,16 @@ from dateutil import parser as dateparser
 
 # --------- LOGGER SETUP ----------
 LOG_FILENAME = "payslip_generator.log"
+LOG_FORMAT = "%(asctime)s [%(levelname)s] %(message)s"
+_file_handler = logging.FileHandler(LOG_FILENAME, mode="a", encoding="utf-8")
+_file_handler.setFormatter(logging.Formatter(LOG_FORMAT))
+# Batch log file writes: flushed every 1000 records, on ERROR, and at interpreter exit
+log_buffer = logging.handlers.MemoryHandler(capacity=1000, target=_file_handler)
 logging.basicConfig(
     level=logging.INFO,
-    format="%(asctime)s [%(levelname)s] %(message)s",
+    format=LOG_FORMAT,
     handlers=[
-        logging.FileHandler(LOG_FILENAME, mode="a", encoding="utf-8"),
+        log_buffer,
         logging.StreamHandler(sys.stdout)
     ]
 )
@@ -52,17 +63,30 @@ logger = logging.getLogger("PayslipGenerator")
 FONT_FILE = "DejaVuSans.ttf"   # set to None if you don't have it
 FALLBACK_FONT = "Helvetica"
 FONT_NAME = FALLBACK_FONT
+# Process-pool workers re-import this module under spawn (Windows / PyInstaller); only the
+# main process reports the font choice, so a batch doesn't log it once per CPU
+_IS_MAIN_PROCESS = multiprocessing.parent_process() is None
 try:
     if FONT_FILE and os.path.exists(FONT_FILE):
         pdfmetrics.registerFont(TTFont("CustomFont", FONT_FILE))
         FONT_NAME = "CustomFont"
-        logger.info(f"Using custom font: {FONT_FILE}")
+        if _IS_MAIN_PROCESS:
+            logger.info(f"Using custom font: {FONT_FILE}")
     else:
         FONT_NAME = FALLBACK_FONT
-        logger.info("Using fallback font: Helvetica")
+        if _IS_MAIN_PROCESS:
+            logger.info("Using fallback font: Helvetica")
 except Exception as e:
     FONT_NAME = FALLBACK_FONT
-    logger.warning(f"Could not register font. Falling back to Helvetica. Error: {e}")
+    if _IS_MAIN_PROCESS:
+        logger.warning(f"Could not register font. Falling back to Helvetica. Error: {e}")
+
+# -------- PARALLELISM -----------
+# ProcessPoolExecutor on Windows refuses more than 61 workers
+PDF_WORKERS = min(os.cpu_count() or 1, 61)
+# Each spawned worker re-imports this module (~0.5s), so small registers are rendered in-process
+PARALLEL_MIN_TASKS = 200
+RENDER_CHUNKSIZE = 16
 
 # -------- COLUMN MAPPING ---------
 COL_CANDIDATES = {
@@ -99,9 +123,25 @@ COL_CANDIDATES = {
     "LabourWelfareFund": ["Labour Welfare Fund", "LabourWelfareFund"]
 }
 
+# Amount columns, in payslip order
+EARNING_KEYS = ["Basic","SpecialAllowance","TravelAllowance","HRA","NH_FH","Reimbursement"]
+DEDUCTION_KEYS = ["EPF","ESI","PT","TDS","Adv_Other","LabourWelfareFund"]
+NUMERIC_KEYS = EARNING_KEYS + DEDUCTION_KEYS
+DATE_KEYS = ["DOB", "DOJ"]
+# Formats tried with strptime before falling back to the (much slower) dateutil parser.
+# Ambiguous numeric dates read month-first, the same as dateutil's default, so every path agrees;
+# day-first-only values such as 13/07/2019 fail %m and reach dateutil, which reads them day-first.
+DATE_FORMATS = ["%Y-%m-%d", "%m/%d/%Y", "%m-%d-%Y", "%d-%b-%Y", "%d %B %Y"]
+
+# Thousands separators, whitespace and currency symbols (\u20b9 = rupee sign) dropped before parsing amounts
+NUMBER_STRIP_TABLE = str.maketrans("", "", ", \t\n\r\u20b9$")
+
+# Values openpyxl returns for Excel error cells
+EXCEL_ERROR_CODES = frozenset(ERROR_CODES)
+
 # -------- UTILS ---------
-def find_column(df_cols, candidates):
-    lower_map = {c.lower(): c for c in df_cols}
+def find_column(lower_map, candidates):
+    """Return the first candidate present in lower_map ({lowercased name: actual column name})."""
     for cand in candidates:
         if not cand:
             continue
@@ -111,353 +151,475 @@ def find_column(df_cols, candidates):
     return None
 
 def build_col_map(df):
+    lower_map = {str(c).lower(): c for c in df.columns}
     mapping = {}
     for key, candidates in COL_CANDIDATES.items():
-        mapping[key] = find_column(df.columns, candidates)
+        mapping[key] = find_column(lower_map, candidates)
     return mapping
 
-def safe_val(row, colname, default=""):
-    if not colname:
+def read_salary_register(file_path):
+    """
+    Stream the salary register with openpyxl in read-only mode and return a DataFrame holding only
+    the columns named in COL_CANDIDATES (matched case-insensitively). Header = Excel row 3;
+    file_path may be a path or a binary file object.
+    """
+    wanted = {cand.lower() for cands in COL_CANDIDATES.values() for cand in cands if cand}
+    # Account numbers stay text so long numbers / leading zeros survive
+    account_cols = {cand.lower() for cand in COL_CANDIDATES["AccountNo"]}
+
+    wb = openpyxl.load_workbook(file_path, read_only=True, data_only=True)
+    try:
+        ws = wb.worksheets[0]
+        # The stored <dimension> can be stale; without this, read-only mode may see no rows at all
+        ws.reset_dimensions()
+        header = next(ws.iter_rows(min_row=3, max_row=3, values_only=True), ())
+        names, positions = [], []
+        for pos, name in enumerate(header):
+            if name is None:
+                continue
+            name = str(name)
+            if name.lower() in wanted and name not in names:
+                names.append(name)
+                positions.append(pos)
+        text_idx = [i for i, name in enumerate(names) if name.lower() in account_cols]
+        records = []
+        for row in ws.iter_rows(min_row=4, max_col=len(header), values_only=True):
+            # Excel error cells (#N/A, #VALUE!, ...) count as blank, as with pandas.read_excel
+            rec = [None if isinstance(row[pos], str) and row[pos] in EXCEL_ERROR_CODES else row[pos]
+                   for pos in positions]
+            for i in text_idx:
+                if rec[i] is not None:
+                    rec[i] = str(rec[i])
+            records.append(rec)
+    finally:
+        wb.close()
+    # Drop trailing empty rows (formatted but blank cells), as pandas.read_excel does
+    while records and all(v is None for v in records[-1]):
+        records.pop()
+
+    return pd.DataFrame.from_records(records, columns=names)
+
+def safe_val(row, pos, default=""):
+    """Read a cell from an itertuples() row by column position; None/NaN/NaT -> default."""
+    if pos is None:
+        return default
+    val = row[pos]
+    if val is None or val is pd.NaT:
         return default
-    val = row.get(colname, default)
-    if pd.isna(val):
+    if isinstance(val, float) and val != val:
         return default
     return val
 
-def to_number(val):
-    if val is None or val == "":
-        return 0.0
-    try:
-        if isinstance(val, str):
-            v = val.replace(",", "").strip()
-            if v == "":
-                return 0.0
-            return float(v)
-        return float(val)
-    except Exception:
-        try:
-            return float(str(val))
-        except:
-            return 0.0
-
 def moneyfmt(val):
     try:
-        d = Decimal(str(val))
-        return f"{d:,.2f}"
-    except (InvalidOperation, Exception):
+        return f"{float(val):,.2f}"
+    except (TypeError, ValueError):
         return "0.00"
 
 def normalize_date(val):
-    if val in (None, ""):
+    if val is None or val == "":
         return ""
     try:
-        if isinstance(val, pd.Timestamp):
+        if isinstance(val, datetime):  # includes pd.Timestamp
             return val.strftime("%d-%m-%Y")
-        return dateparser.parse(str(val)).strftime("%d-%m-%Y")
+        s = str(val).strip()
+        for fmt in DATE_FORMATS:
+            try:
+                return datetime.strptime(s, fmt).strftime("%d-%m-%Y")
+            except ValueError:
+                pass
+        return dateparser.parse(s).strftime("%d-%m-%Y")
     except Exception:
         return str(val)
 
+def normalize_numeric_column(series):
+    """Parse an amount column: strip separators/currency symbols, coerce, blanks/invalid -> 0.0."""
+    if not pd.api.types.is_numeric_dtype(series):
+        series = series.astype(str).str.translate(NUMBER_STRIP_TABLE)
+    return pd.to_numeric(series, errors="coerce").fillna(0.0)
+
+def normalize_date_column(series):
+    """
+    Vectorized normalize_date(). Datetime cells are formatted directly and strings are parsed with
+    DATE_FORMATS in the same order normalize_date() tries them, so a value reads the same wherever
+    it sits in the column. Everything else (numbers, unmatched strings) goes through normalize_date().
+    """
+    if pd.api.types.is_datetime64_any_dtype(series):
+        return series.dt.strftime("%d-%m-%Y").fillna("")
+
+    out = pd.Series("", index=series.index, dtype=object)
+    is_datetime = series.map(lambda v: isinstance(v, datetime)).astype(bool)
+    if is_datetime.any():
+        out[is_datetime] = pd.to_datetime(series[is_datetime]).dt.strftime("%d-%m-%Y")
+
+    is_string = series.map(lambda v: isinstance(v, str)).astype(bool)
+    # astype(object): with no string cells the selection keeps the column's numeric dtype,
+    # which has no .str accessor
+    strings = series[is_string].astype(object).str.strip()
+    for fmt in DATE_FORMATS:
+        if strings.empty:
+            break
+        parsed = pd.to_datetime(strings, format=fmt, errors="coerce")
+        matched = parsed.notna()
+        out[matched[matched].index] = parsed[matched].dt.strftime("%d-%m-%Y")
+        strings = strings[~matched]
+
+    rest = series.notna() & ~is_datetime & ~is_string
+    rest[strings.index] = True  # strings no format matched
+    if rest.any():
+        out[rest] = series[rest].map(normalize_date)
+    return out.fillna("")
+
+# -------- PAGE LAYOUT ------------
+# All coordinates depend only on A4 and the page margin, so they are computed once at import.
+PAGE_W, PAGE_H = A4
+MARGIN = 12 * mm
+COMPANY_BLUE = colors.HexColor("#0074D9")
+BAND_BLUE = colors.HexColor("#7fb0d6")
+
+# Header company name & address (moved down a bit to avoid collision with top border)
+TOP_Y = PAGE_H - MARGIN - 26
+ADDRESS_MARGIN = 40  # left+right margin for address area in points (adjust if needed)
+MAX_ADDR_WIDTH = PAGE_W - 2 * (MARGIN + ADDRESS_MARGIN)
+ADDR_START_Y = TOP_Y - 14
+ADDR_LINE_HEIGHT = 11  # approx font size + small leading
+
+# EMPLOYEE DETAILS box (enlarged so DOB fits)
+BOX_X = MARGIN + 6
+BOX_W = PAGE_W - 2 * (MARGIN + 6)
+BOX_TOP = TOP_Y - 46
+BOX_H = 80
+LEFT_W = BOX_W * 0.61
+X_LEFT = BOX_X + 8
+RX = BOX_X + LEFT_W + 11
+
+# PAYMENT & LEAVE BALANCES box under employee details (enlarged)
+PL_TOP = BOX_TOP - BOX_H - 8
+PL_H = 70
+
+# Earnings & Deductions big box
+ED_TOP = PL_TOP - PL_H - 10
+ED_H = 220
+HEADER_H = 18
+LEFT_COL_X = BOX_X + 8
+AMT_X = BOX_X + BOX_W * 0.48 + 60
+DED_COL_X = BOX_X + BOX_W * 0.62 + 8
+DED_AMT_X = BOX_X + BOX_W - 20
+ROWS_TOP_Y = ED_TOP - HEADER_H - 12
+TOTALS_Y = ED_TOP - ED_H + 12
+GROSS_FOOTER_Y = ED_TOP - ED_H + 25
+FOOTER_Y = ED_TOP - ED_H - 28
+
+EARNING_LABELS = ["Basic", "Special Allowance", "Travel Allowance", "House Rent Allowance", "NH/FH", "Reimbursement"]
+DEDUCTION_LABELS = ["EPF", "ESI", "PT", "TDS", "Adv/Other", "Labour Welfare Fun"]
+
+# (x, y, label, data key) for the employee details; each value is drawn to the right of its label
+EMP_LEFT_FIELDS = [(X_LEFT, BOX_TOP - 14 - i * 12, label, key) for i, (label, key) in enumerate([
+    ("Employee Name", "EmployeeName"), ("E code", "Ecode"), ("Designation", "Designation"),
+    ("Department", "Department"), ("Father / Husband Name", "FatherName"), ("DOB", "DOB")])]
+# below "Location", whose value comes from header_info
+EMP_RIGHT_FIELDS = [(RX, BOX_TOP - 26 - i * 12, label, key) for i, (label, key) in enumerate([
+    ("UAN", "UAN"), ("Esi No", "ESI_No"), ("PAN No", "PAN_No"), ("DOJ", "DOJ")])]
+PAYMENT_FIELDS = [(BOX_X + 6, PL_TOP - 30, "Pay Mode", "PayMode"), (BOX_X + 6, PL_TOP - 46, "Bank name", "BankName")]
+
+# (x, y, label) for the column headers in the blue band and for the earnings / deduction rows
+ED_HEADER_LABELS = [
+    (BOX_X + 8, ED_TOP - HEADER_H + 4, "Earnings"),
+    (BOX_X + BOX_W * 0.53, ED_TOP - HEADER_H + 4, "Amount"),
+    (BOX_X + BOX_W * 0.62 + 8, ED_TOP - HEADER_H + 4, "Deduction"),
+    (BOX_X + BOX_W - 52, ED_TOP - HEADER_H + 4, "Amount"),
+]
+EARNING_ROWS = [(LEFT_COL_X, ROWS_TOP_Y - i * 14, label) for i, label in enumerate(EARNING_LABELS)]
+DEDUCTION_ROWS = [(DED_COL_X, ROWS_TOP_Y - i * 14, label) for i, label in enumerate(DEDUCTION_LABELS)]
+
 # -------- PDF DRAWING (pixel-perfect) ---------
-def draw_payslip_to_bytes(header_info, data):
+# One output buffer per thread, reused for every payslip a process-pool worker renders
+_render_local = threading.local()
+
+def _reusable_buffer():
+    buf = getattr(_render_local, "buffer", None)
+    if buf is None:
+        buf = _render_local.buffer = io.BytesIO()
+    buf.seek(0)
+    buf.truncate(0)
+    return buf
+
+@functools.lru_cache(maxsize=64)
+def wrap_text_to_width(text, font_name, font_size, max_width):
+    """Greedy word wrap of text to max_width points; returns a tuple of lines."""
+    words = str(text).split()
+    if not words:
+        return ()
+    space_w = pdfmetrics.stringWidth(" ", font_name, font_size)
+    word_widths = [pdfmetrics.stringWidth(w, font_name, font_size) for w in words]
+    lines = []
+    cur, cur_w = [words[0]], word_widths[0]
+    for w, w_width in zip(words[1:], word_widths[1:]):
+        if cur_w + space_w + w_width <= max_width:
+            cur.append(w)
+            cur_w += space_w + w_width
+        else:
+            lines.append(" ".join(cur))
+            cur, cur_w = [w], w_width
+    lines.append(" ".join(cur))
+    return tuple(lines)
+
+def draw_payslip_to_bytes(header_info, data, amounts):
     """
     Return PDF bytes (in-memory) for one payslip using layout tuned to the screenshots.
+    - amounts = (earnings, deductions, gross, total_ded): the six earnings and six deductions
+      in EARNING_KEYS / DEDUCTION_KEYS order plus their precomputed totals
     - Shows PL / SL / CL values in PAYMENT & LEAVE BALANCES box
     - Draws small rounded light-blue stat boxes: Work days, India, Overseas, LOP, Secondment
     """
-    buffer = io.BytesIO()
-    W, H = A4
-    c = canvas.Canvas(buffer, pagesize=A4)
-    margin = 12 * mm
+    buffer = _reusable_buffer()
+    c = canvas.Canvas(buffer, pagesize=A4, pageCompression=1)
 
     # Outer thick border
     c.setLineWidth(2)
     c.setStrokeColor(colors.black)
-    c.rect(margin, margin, W - 2*margin, H - 2*margin)
+    c.rect(MARGIN, MARGIN, PAGE_W - 2*MARGIN, PAGE_H - 2*MARGIN)
 
-    # Header company name & address (moved down a bit to avoid collision with top border)
-    top_y = H - margin - 26
+    # Header company name
     c.setFont(FONT_NAME, 18)
-    c.setFillColor(colors.HexColor("#0074D9"))  # blue company name (optional)
-    c.drawCentredString(W/2, top_y, header_info.get("company", ""))
+    c.setFillColor(COMPANY_BLUE)  # blue company name (optional)
+    c.drawCentredString(PAGE_W/2, TOP_Y, header_info.get("company", ""))
     # --- Wrapped, centered address lines ---
     c.setFont(FONT_NAME, 9)
     c.setFillColor(colors.black)
-    address_text = header_info.get("address", "") or ""
-
-    # compute available width for address: slightly narrower than page width to avoid touching border
-    address_margin = 40  # left+right margin for address area in points (adjust if needed)
-    max_addr_width = W - 2 * (margin + address_margin)
-
-    # helper: wrap text to fit in max_width using pdfmetrics.stringWidth
-    def wrap_text_to_width(text, font_name, font_size, max_width):
-        words = str(text).split()
-        if not words:
-            return []
-        lines = []
-        cur = words[0]
-        for w in words[1:]:
-            test = cur + " " + w
-            if pdfmetrics.stringWidth(test, font_name, font_size) <= max_width:
-                cur = test
-            else:
-                lines.append(cur)
-                cur = w
-        lines.append(cur)
-        return lines
-    
-    address_lines = wrap_text_to_width(address_text, FONT_NAME, 9, max_addr_width)
+    address_lines = header_info.get("address_lines")
+    if address_lines is None:
+        address_lines = wrap_text_to_width(header_info.get("address", "") or "", FONT_NAME, 9, MAX_ADDR_WIDTH)
 
     # draw each wrapped line centered under the company name
-    # start a little lower than the company name (top_y - 14 as before)
-    addr_start_y = top_y - 14
-    line_height = 11  # approx font size + small leading
     for i, line in enumerate(address_lines):
-        c.drawCentredString(W/2, addr_start_y - i * line_height, line)
- 
+        c.drawCentredString(PAGE_W/2, ADDR_START_Y - i * ADDR_LINE_HEIGHT, line)
 
     # Payslip month
     c.setFont(FONT_NAME, 10)
-    c.drawString(margin + 6, top_y - 36, f"Payslip for the Month :  {header_info.get('month','')}")
-    #logger.info("=== after month ===")
-    #logger.info(f"Location value: {header_info.get('location','')}")
-
+    c.drawString(MARGIN + 6, TOP_Y - 36, f"Payslip for the Month :  {header_info.get('month','')}")
 
-    # EMPLOYEE DETAILS box (enlarged so DOB fits)
-    box_x = margin + 6
-    box_w = W - 2*(margin + 6)
-    box_top = top_y - 46
-    box_h = 80   # enlarged to fit DOB properly
+    # EMPLOYEE DETAILS box, split into two columns
     c.setLineWidth(1)
-    c.rect(box_x, box_top - box_h, box_w, box_h)
-
-    # vertical split for columns
-    left_w = box_w * 0.61
-    c.line(box_x + left_w, box_top - box_h, box_x + left_w, box_top)
+    c.rect(BOX_X, BOX_TOP - BOX_H, BOX_W, BOX_H)
+    c.line(BOX_X + LEFT_W, BOX_TOP - BOX_H, BOX_X + LEFT_W, BOX_TOP)
 
     # left column contents
-    x_left = box_x + 8
-    y = box_top - 14
     c.setFont(FONT_NAME, 9)
-    c.drawString(x_left, y, "Employee Name")
-    c.drawString(x_left + 110, y, str(data.get("EmployeeName","")))
-    y -= 12
-    c.drawString(x_left, y, "E code")
-    c.drawString(x_left + 110, y, str(data.get("Ecode","")))
-    y -= 12
-    c.drawString(x_left, y, "Designation")
-    c.drawString(x_left + 110, y, str(data.get("Designation","")))
-    y -= 12
-    c.drawString(x_left, y, "Department")
-    c.drawString(x_left + 110, y, str(data.get("Department","")))
-    y -= 12
-    c.drawString(x_left, y, "Father / Husband Name")
-    c.drawString(x_left + 110, y, str(data.get("FatherName","")))
-    y -= 12
-    c.drawString(x_left, y, "DOB")
-    c.drawString(x_left + 110, y, str(data.get("DOB","")))
+    for x, y, label, key in EMP_LEFT_FIELDS:
+        c.drawString(x, y, label)
+        c.drawString(x + 110, y, str(data.get(key, "")))
 
     # right column contents
-    rx = box_x + left_w + 11
-    ry = box_top - 14
-    c.drawString(rx, ry, "Location")
-    c.drawString(rx + 70, ry, str(header_info.get("location","")))
-    #logger.info(f"Location value: {header_info.get('location','')}") # Debug log for location
-    ry -= 12
+    c.drawString(RX, BOX_TOP - 14, "Location")
+    c.drawString(RX + 70, BOX_TOP - 14, str(header_info.get("location","")))
     # UAN default to 'NIL' if blank
     UAN_val = data.get("UAN", "")
-    if UAN_val in ("", None) or (isinstance(UAN_val, float) and pd.isna(UAN_val)):
+    if UAN_val in ("", None) or (isinstance(UAN_val, float) and UAN_val != UAN_val):
         data["UAN"] = "NIL"
     if isinstance(UAN_val, float) and UAN_val.is_integer():
         data["UAN"] = str(int(UAN_val))
-    c.drawString(rx, ry, "UAN")
-    c.drawString(rx + 70, ry, str(data.get("UAN","")))
-    ry -= 12
-    c.drawString(rx, ry, "Esi No")
-    c.drawString(rx + 70, ry, str(data.get("ESI_No","")))
-    ry -= 12
-    c.drawString(rx, ry, "PAN No")
-    c.drawString(rx + 70, ry, str(data.get("PAN_No","")))
-    ry -= 12
-    c.drawString(rx, ry, "DOJ")
-    c.drawString(rx + 70, ry, str(data.get("DOJ","")))
-
-    # PAYMENT & LEAVE BALANCES box under employee details (enlarged)
-    pl_top = box_top - box_h - 8
-    pl_h = 70   # slightly larger for PL/SL/CL & account lines
-    c.rect(box_x, pl_top - pl_h, box_w, pl_h)
-    c.setFont(FONT_NAME, 9)
-    c.drawString(box_x + 6, pl_top - 14, "PAYMENT & LEAVE BALANCES")
+    for x, y, label, key in EMP_RIGHT_FIELDS:
+        c.drawString(x, y, label)
+        c.drawString(x + 70, y, str(data.get(key, "")))
+
+    # PAYMENT & LEAVE BALANCES box under employee details
+    c.rect(BOX_X, PL_TOP - PL_H, BOX_W, PL_H)
+    c.drawString(BOX_X + 6, PL_TOP - 14, "PAYMENT & LEAVE BALANCES")
 
     # Paid Days and LOP (default LOP->0 if blank)
     lop_val = data.get("LOP", "")
-    if lop_val in ("", None) or (isinstance(lop_val, float) and pd.isna(lop_val)):
+    if lop_val in ("", None) or (isinstance(lop_val, float) and lop_val != lop_val):
         data["LOP"] = "0"
     paid_days_val = data.get("PaidDays", "")
-    c.drawRightString(box_x + box_w * 0.80 + 8, pl_top - 14, f"Paid Days  {paid_days_val}    LOP  {data.get('LOP','')}")
-
-    # left area details: Pay Mode / Bank name / Account No
-    c.drawString(box_x + 6, pl_top - 30, "Pay Mode")
-    c.drawString(box_x + 66, pl_top - 30, str(data.get("PayMode","")))
-    c.drawString(box_x + 6, pl_top - 46, "Bank name")
-    c.drawString(box_x + 66, pl_top - 46, str(data.get("BankName","")))
-    c.drawString(box_x + 6, pl_top - 62, "Account No")
+    c.drawRightString(BOX_X + BOX_W * 0.80 + 8, PL_TOP - 14, f"Paid Days  {paid_days_val}    LOP  {data.get('LOP','')}")
+
+    # Pay Mode / Bank name / Account No
+    for x, y, label, key in PAYMENT_FIELDS:
+        c.drawString(x, y, label)
+        c.drawString(x + 60, y, str(data.get(key, "")))
+    c.drawString(BOX_X + 6, PL_TOP - 62, "Account No")
     # ensure account no doesn't get clipped - format as string and trim trailing .0 from floats
     acc = data.get("AccountNo", "")
     if isinstance(acc, float) and acc.is_integer():
         acc = str(int(acc))
     else:
         acc = str(acc)
-    c.drawString(box_x + 66, pl_top - 62, str(acc))
-
-    # Earnings & Deductions big box
-    ed_top = pl_top - pl_h - 10
-    ed_h = 220
-    c.rect(box_x, ed_top - ed_h, box_w, ed_h)
+    c.drawString(BOX_X + 66, PL_TOP - 62, acc)
 
-    # header band for columns (blue)
-    header_h = 18
-    c.setFillColor(colors.HexColor("#7fb0d6"))
-    c.rect(box_x, ed_top - header_h, box_w, header_h, stroke=0, fill=1)
+    # Earnings & Deductions big box, with the blue header band for its columns
+    c.rect(BOX_X, ED_TOP - ED_H, BOX_W, ED_H)
+    c.setFillColor(BAND_BLUE)
+    c.rect(BOX_X, ED_TOP - HEADER_H, BOX_W, HEADER_H, stroke=0, fill=1)
     c.setFillColor(colors.black)
     c.setFont(FONT_NAME, 10)
-    c.drawString(box_x + 8, ed_top - header_h + 4, "Earnings")
-    c.drawString(box_x + box_w * 0.53 , ed_top - header_h + 4, "Amount")
-    c.drawString(box_x + box_w * 0.62 + 8, ed_top - header_h + 4, "Deduction")
-    c.drawString(box_x + box_w - 52, ed_top - header_h + 4, "Amount")
-
-    # columns coordinates
-    left_col_x = box_x + 8
-    amt_x = box_x + box_w * 0.48 + 60
-    ded_col_x = box_x + box_w * 0.62 + 8
-    ded_amt_x = box_x + box_w - 20
-
-    # Earnings rows
-    c.setFont(FONT_NAME, 9)
-    y_row = ed_top - header_h - 12
-    earnings_rows = [
-        ("Basic", data.get("Basic", 0.0)),
-        ("Special Allowance", data.get("SpecialAllowance", 0.0)),
-        ("Travel Allowance", data.get("TravelAllowance", 0.0)),
-        ("House Rent Allowance", data.get("HRA", 0.0)),
-        ("NH/FH", data.get("NH_FH", 0.0)),
-        ("Reimbursement", data.get("Reimbursement", 0.0)),
-    ]
-    for label, val in earnings_rows:
-        c.drawString(left_col_x, y_row, label)
-        c.drawRightString(amt_x, y_row, moneyfmt(val))
-        y_row -= 14
+    for x, y, label in ED_HEADER_LABELS:
+        c.drawString(x, y, label)
 
-    # Gross
-    gross = sum([float(data.get(k, 0) or 0) for k in ["Basic","SpecialAllowance","TravelAllowance","HRA","NH_FH","Reimbursement"]])
+    # Earnings rows, then Gross
+    earnings, deductions, gross, total_ded = amounts
+    c.setFont(FONT_NAME, 9)
+    for (x, y, label), val in zip(EARNING_ROWS, earnings):
+        c.drawString(x, y, label)
+        c.drawRightString(AMT_X, y, moneyfmt(val))
     c.setFont(FONT_NAME, 10)
-    c.drawString(left_col_x, ed_top - ed_h + 12, "Gross Earnings")
-    c.drawRightString(amt_x, ed_top - ed_h + 12, moneyfmt(gross))
+    c.drawString(LEFT_COL_X, TOTALS_Y, "Gross Earnings")
+    c.drawRightString(AMT_X, TOTALS_Y, moneyfmt(gross))
 
-    # Deductions rows
+    # Deductions rows, then Total Deductions
     c.setFont(FONT_NAME, 9)
-    dy = ed_top - header_h - 12
-    deductions_rows = [
-        ("EPF", data.get("EPF", 0.0)),
-        ("ESI", data.get("ESI", 0.0)),
-        ("PT", data.get("PT", 0.0)),
-        ("TDS", data.get("TDS", 0.0)),
-        ("Adv/Other", data.get("Adv_Other", 0.0)),
-        ("Labour Welfare Fun", data.get("LabourWelfareFund", 0.0)),
-    ]
-    for label, val in deductions_rows:
-        c.drawString(ded_col_x, dy, label)
-        c.drawRightString(ded_amt_x, dy, moneyfmt(val))
-        dy -= 14
-
-    total_ded = sum([float(data.get(k, 0) or 0) for k in ["EPF","ESI","PT","TDS","Adv_Other","LabourWelfareFund"]])
+    for (x, y, label), val in zip(DEDUCTION_ROWS, deductions):
+        c.drawString(x, y, label)
+        c.drawRightString(DED_AMT_X, y, moneyfmt(val))
     c.setFont(FONT_NAME, 10)
-    c.drawString(ded_col_x, ed_top - ed_h + 12, "Total Deductions")
-    c.drawRightString(ded_amt_x, ed_top - ed_h + 12, moneyfmt(total_ded))
-
-    # Draw table grid for Earnings/Deductions columns
-    num_rows = max(len(earnings_rows), len(deductions_rows))
-    row_height = ed_h / (num_rows + 2)  # +2 for Gross/Total rows
-    table_top = ed_top
-    table_left = box_x
-    table_width = box_w
-    table_height = row_height * (num_rows + 2)  # +2 for Gross/Total rows
-
-    # Draw vertical lines
-    c.setLineWidth(0.5)
-    c.line(table_left, table_top, table_left, table_top - table_height)
-    c.line(amt_x + 8, table_top, amt_x + 8, table_top - table_height)
-    #c.line(ded_col_x - 4, table_top, ded_col_x - 4, table_top - table_height)
-    #c.line(ded_amt_x + 4, table_top, ded_amt_x + 4, table_top - table_height)
-    c.line(table_left + table_width, table_top, table_left + table_width, table_top - table_height)
-
-    # Draw horizontal lines only for header and footer (Gross/Total rows)
-    # Header line
-    c.line(table_left, ed_top, table_left + table_width, ed_top)
-    c.line(table_left, ed_top - header_h, table_left + table_width, ed_top - header_h)
-    # Gross Earnings and Total Deductions row line (footer)
-    gross_footer_y = ed_top - ed_h + 25  # Adjust as needed for alignment
-    c.line(table_left, gross_footer_y, table_left + table_width, gross_footer_y)
-
+    c.drawString(DED_COL_X, TOTALS_Y, "Total Deductions")
+    c.drawRightString(DED_AMT_X, TOTALS_Y, moneyfmt(total_ded))
 
+    # Table grid for Earnings/Deductions columns: verticals, plus header and footer (Gross/Total) lines
+    c.setLineWidth(0.5)
+    c.line(BOX_X, ED_TOP, BOX_X, ED_TOP - ED_H)
+    c.line(AMT_X + 8, ED_TOP, AMT_X + 8, ED_TOP - ED_H)
+    c.line(BOX_X + BOX_W, ED_TOP, BOX_X + BOX_W, ED_TOP - ED_H)
+    c.line(BOX_X, ED_TOP, BOX_X + BOX_W, ED_TOP)
+    c.line(BOX_X, ED_TOP - HEADER_H, BOX_X + BOX_W, ED_TOP - HEADER_H)
+    c.line(BOX_X, GROSS_FOOTER_Y, BOX_X + BOX_W, GROSS_FOOTER_Y)
 
     # Net Pay footer
     net = gross - total_ded
-    footer_y = ed_top - ed_h - 28
     c.setLineWidth(1.5)
-    c.line(box_x, footer_y + 28, box_x + box_w, footer_y + 28)
+    c.line(BOX_X, FOOTER_Y + 28, BOX_X + BOX_W, FOOTER_Y + 28)
     c.setFont(FONT_NAME, 12)
-    c.drawString(box_x + 10, footer_y + 8, f"Total Net Payable Rs.{moneyfmt(net)}/-")
+    c.drawString(BOX_X + 10, FOOTER_Y + 8, f"Total Net Payable Rs.{moneyfmt(net)}/-")
     c.setFont(FONT_NAME, 8)
-    c.drawRightString(box_x + box_w - 10, footer_y + 8, "(Net Payable = Gross Earnings - Total Deductions)")
+    c.drawRightString(BOX_X + BOX_W - 10, FOOTER_Y + 8, "(Net Payable = Gross Earnings - Total Deductions)")
 
     # small footer identity
-    c.setFont(FONT_NAME, 8)
-    c.drawString(box_x + 10, margin + 8, f"Employee: {data.get('EmployeeName','')}   Ecode: {data.get('Ecode','')}")
+    c.drawString(BOX_X + 10, MARGIN + 8, f"Employee: {data.get('EmployeeName','')}   Ecode: {data.get('Ecode','')}")
     c.showPage()
     c.save()
 
-    buffer.seek(0)
-    return buffer.read()
+    return buffer.getvalue()
 
 
 # -------- PROCESS & ZIP ---------
-def process_file(file_path, company, address, month, location):
-    if not os.path.exists(file_path):
+def _render_one(task):
+    """
+    Process-pool worker: render one payslip and return (pdf_filename, pdf_bytes).
+    pdf_bytes is None if rendering failed (the error is logged from the worker).
+    """
+    row_no, pdf_filename, header_info, data, amounts = task
+    try:
+        return pdf_filename, draw_payslip_to_bytes(header_info, data, amounts)
+    except Exception:
+        logger.exception(f"Failed creating payslip for row {row_no} ({data.get('EmployeeName', '')})")
+        return pdf_filename, None
+
+# One pool shared by every batch (the Flask app runs batches back to back, and on several threads),
+# so worker start-up is paid once rather than per request. Created lazily and grown on demand.
+_render_pool = None
+_render_pool_workers = 0
+_render_pool_lock = threading.Lock()
+
+def _submit_to_render_pool(tasks, workers):
+    """Queue tasks on the shared pool (resizing it if it is smaller than workers); return (pool, results)."""
+    global _render_pool, _render_pool_workers
+    with _render_pool_lock:
+        if _render_pool is None or _render_pool_workers < workers:
+            if _render_pool is not None:
+                # work already queued by other batches still completes
+                _render_pool.shutdown(wait=False)
+            _render_pool = concurrent.futures.ProcessPoolExecutor(max_workers=workers)
+            _render_pool_workers = workers
+        # map() submits everything up front, so the pool can't be swapped out mid-submission
+        return _render_pool, _render_pool.map(_render_one, tasks, chunksize=RENDER_CHUNKSIZE)
+
+def _discard_render_pool(pool):
+    """Drop a broken pool so the next batch starts a fresh one."""
+    global _render_pool, _render_pool_workers
+    with _render_pool_lock:
+        if _render_pool is pool:
+            _render_pool = None
+            _render_pool_workers = 0
+    pool.shutdown(wait=False, cancel_futures=True)
+
+def default_zip_name(month):
+    """Payslips_<month>_<timestamp>.zip, with the month reduced to filename-safe characters."""
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    safe_month = "".join(ch for ch in month if ch.isalnum() or ch in (" ", "_")).replace(" ", "_")
+    return f"Payslips_{safe_month}_{timestamp}.zip"
+
+def process_file(file_path, company, address, month, location, output_zip_path=None):
+    """
+    Generate all payslips from the salary register at file_path (a path or a binary file object).
+    The ZIP is written to output_zip_path; for a path it defaults to a ZIP next to the register,
+    while a file object has no location of its own, so output_zip_path is required.
+    Returns the ZIP path, or None if the inputs were invalid or the register could not be read.
+    """
+    is_path = isinstance(file_path, (str, os.PathLike))
+    if not is_path and not output_zip_path:
+        logger.error("output_zip_path is required when the salary register is a file object")
+        return
+    if is_path and not os.path.exists(file_path):
         logger.error(f"Salary register file not found: {file_path}")
         return
+    register_name = file_path if is_path else "uploaded file"
 
     try:
-        # When reading the Excel file
-        df = pd.read_excel(file_path, header=2, engine="openpyxl", dtype={"Account No": str, "AccountNo": str})
-        logger.info(f"Loaded salary register: {file_path} (rows: {len(df)})")
+        df = read_salary_register(file_path)
+        logger.info(f"Loaded salary register: {register_name} (rows: {len(df)})")
     except Exception as e:
         logger.exception("Error reading Excel file")
         return
 
     mapping = build_col_map(df)
     logger.debug(f"Column mapping: {mapping}")
+    col_positions = {key: df.columns.get_loc(colname) for key, colname in mapping.items() if colname}
+
+    # Blank rows must be detected before normalization turns empty amounts into 0.0
+    blank_rows = (df.isna() | df.eq("")).all(axis=1).to_numpy()
+
+    # Normalize numeric and date columns once, instead of per cell inside the row loop
+    for key in NUMERIC_KEYS:
+        if mapping.get(key):
+            df[mapping[key]] = normalize_numeric_column(df[mapping[key]])
+    for key in DATE_KEYS:
+        if mapping.get(key):
+            df[mapping[key]] = normalize_date_column(df[mapping[key]])
+    row_fields = [(key, col_positions.get(key), "") for key in mapping if key not in NUMERIC_KEYS]
+
+    # Amounts as dense (rows x 6) float arrays, so the totals are a single vectorized sum;
+    # columns missing from the register are zeros
+    def amount_matrix(keys):
+        return np.column_stack([
+            df[mapping[key]].to_numpy(dtype=np.float64) if mapping.get(key) else np.zeros(len(df))
+            for key in keys
+        ])
+    earn_arr = amount_matrix(EARNING_KEYS)
+    ded_arr = amount_matrix(DEDUCTION_KEYS)
+    gross = earn_arr.sum(axis=1).tolist()
+    total_ded = ded_arr.sum(axis=1).tolist()
+    earn_rows = earn_arr.tolist()
+    ded_rows = ded_arr.tolist()
+
+    if output_zip_path:
+        zip_name = output_zip_path
+    else:
+        base_dir = os.path.dirname(os.path.abspath(file_path)) or "."
+        zip_name = os.path.join(base_dir, default_zip_name(month))
 
-    base_dir = os.path.dirname(os.path.abspath(file_path)) or "."
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    safe_month = "".join(ch for ch in month if ch.isalnum() or ch in (" ", "_")).replace(" ", "_")
-    zip_name = os.path.join(base_dir, f"Payslips_{safe_month}_{timestamp}.zip")
-    zipf = zipfile.ZipFile(zip_name, "w", zipfile.ZIP_DEFLATED)
+    header_info = {"company": company, "address": address, "month": month, "location": location}
+    # The address is the same on every payslip, so wrap it once for the whole batch
+    header_info["address_lines"] = wrap_text_to_width(address or "", FONT_NAME, 9, MAX_ADDR_WIDTH)
 
-    count = 0
-    for idx, row in df.iterrows():
-        if row.isnull().all():
+    # Phase 1: build render tasks (cheap, sequential)
+    tasks = []
+    for idx, row in enumerate(df.itertuples(index=False, name=None)):
+        if blank_rows[idx]:
             continue
         #Build data
         data = {}
-        for key, colname in mapping.items():
-            data[key] = safe_val(row, colname, "")
-        #normalize numarics
-        for n in ["Basic","SpecialAllowance","TravelAllowance","HRA","NH_FH","Reimbursement",
-                  "EPF","ESI","PT","TDS","Adv_Other","LabourWelfareFund"]:
-            data[n] = to_number(data.get(n, 0))
-        #Date normalization
-        data["DOB"] = normalize_date(data.get("DOB",""))
-        data["DOJ"] = normalize_date(data.get("DOJ",""))
+        for key, pos, default in row_fields:
+            data[key] = safe_val(row, pos, default)
         #Defaults for missing fields
         data.setdefault("PaidDays","")
         data.setdefault("LOP","")
@@ -471,20 +633,47 @@ def process_file(file_path, company, address, month, location):
         name = str(data.get("EmployeeName","")).strip() or "Unknown"
         safe_name = "_".join(name.split())
         pdf_filename = f"Payslip_{ecode}_{safe_name}.pdf"
+        amounts = (earn_rows[idx], ded_rows[idx], gross[idx], total_ded[idx])
+        tasks.append((idx + 4, pdf_filename, header_info, data, amounts))
 
-        try:
-            pdf_bytes = draw_payslip_to_bytes(
-                {"company": company, "address": address, "month": month, "location": location}, data
-            )
-            zipf.writestr(pdf_filename, pdf_bytes)
-            count += 1
-            logger.info(f"Added to ZIP: {pdf_filename}")
-        except Exception as e:
-            logger.exception(f"Failed creating payslip for row {idx+4} ({name})")
-
+    # Phase 2: render PDFs (in worker processes for large batches), write ZIP entries here
+    # (ZipFile is not process-safe)
+    # Flush buffered log records first, so forked workers don't inherit (and re-emit) them
+    log_buffer.flush()
+    count = 0
+    pool = None
+    zip_time = time.localtime()[:6]  # one timestamp for every entry in the batch
+    try:
+        # PDF content streams are already zlib-compressed by ReportLab, so store them as-is
+        with zipfile.ZipFile(zip_name, "w", zipfile.ZIP_STORED, allowZip64=True) as zipf:
+            if len(tasks) < PARALLEL_MIN_TASKS or PDF_WORKERS == 1:
+                results = map(_render_one, tasks)
+            else:
+                workers = min(PDF_WORKERS, math.ceil(len(tasks) / RENDER_CHUNKSIZE))
+                pool, results = _submit_to_render_pool(tasks, workers)
+            for pdf_filename, pdf_bytes in results:
+                if pdf_bytes is None:
+                    continue
+                zinfo = zipfile.ZipInfo(filename=pdf_filename, date_time=zip_time)
+                zinfo.compress_type = zipfile.ZIP_STORED
+                zinfo.external_attr = 0o644 << 16
+                zipf.writestr(zinfo, pdf_bytes)
+                count += 1
+                logger.debug("Added to ZIP: %s", pdf_filename)
+                if count % 100 == 0:
+                    logger.info("Rendered %d payslips", count)
+    except BaseException as e:
+        # e.g. BrokenProcessPool when a worker is killed: don't leave a partial ZIP behind
+        logger.error(f"Payslip generation aborted after {count} payslips; removing {zip_name}")
+        if pool is not None and isinstance(e, concurrent.futures.BrokenExecutor):
+            _discard_render_pool(pool)
+        if os.path.exists(zip_name):
+            os.remove(zip_name)
+        raise
 
-    zipf.close()
     logger.info(f"Done. Generated {count} payslips and saved ZIP: {zip_name}")
+    log_buffer.flush()  # the Flask app is long-lived; get each batch onto disk when it finishes
+    return zip_name
 
 # -------- MAIN ---------
 import argparse
@@ -496,11 +685,14 @@ def parse_args():
     parser.add_argument("--month", help="Payslip month (e.g. 'August 2025')")
     parser.add_argument("--location", help="Work location of employees")
     parser.add_argument("--salary", help="Path to salary register file (e.g. SALARY REG.xlsm)")
+    parser.add_argument("--quiet", action="store_true", help="Only log warnings and errors (e.g. for CI runs)")
     return parser.parse_args()
 
 def main():
-    logger.info("=== Payslip Generator Started ===")
     args = parse_args()
+    if args.quiet:
+        logger.setLevel(logging.WARNING)
+    logger.info("=== Payslip Generator Started ===")
 
     # Interactive fallback (when arguments are not passed)
     if not any([args.company, args.address, args.month, args.location, args.salary]):
@@ -529,4 +721,5 @@ def main():
     logger.info("=== Payslip Generator Finished ===")
 
 if __name__ == "__main__":
+    multiprocessing.freeze_support()
     main()